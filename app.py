@@ -1,62 +1,120 @@
-import json
+import gc
+import hashlib
 import os
-import subprocess
-from flask import Flask, render_template, abort
+import orjson
+from flask import Flask, Response, render_template, abort, request
 
 app = Flask(__name__)
 
+def read_git_head():
+    with open('.git/HEAD') as f:
+        head = f.read().strip()
+    if not head.startswith('ref: '):
+        return head
+    ref = head[5:]
+    try:
+        with open(f'.git/{ref}') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        with open('.git/packed-refs') as f:
+            for line in f:
+                sha, _, name = line.strip().partition(' ')
+                if name == ref:
+                    return sha
+    return ''
+
 def get_commit_sha():
     sha = os.environ.get('SOURCE_VERSION', '')
     if not sha:
         try:
-            sha = subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
-        except Exception:
+            sha = read_git_head()
+        except OSError:
             sha = ''
     return sha[:7] if sha else 'dev'
 
 COMMIT_SHA = get_commit_sha()
+app.jinja_env.globals['commit_sha'] = COMMIT_SHA
 
-@app.context_processor
-def inject_globals():
-    return {'commit_sha': COMMIT_SHA}
+_DATA = None
 
 def load_data():
-    with open('data.json') as f:
-        return json.load(f)
+    global _DATA
+    if _DATA is None or app.debug:
+        with open('data.json', 'rb') as f:
+            _DATA = orjson.loads(f.read())
+    return _DATA
+
+def prerender(template, **context):
+    with app.app_context():
+        body = render_template(template, **context).encode()
+    return body, hashlib.md5(body).hexdigest()
+
+def page_response(page):
+    body, etag = page
+    response = Response(body, mimetype='text/html', direct_passthrough=True)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
+
+THREAT_ORDER = ['extreme', 'critical', 'high', 'moderate', 'low']
+NO_STRATEGIES = ()
+
+def best_summary(strategies):
+    best_strategy = next((s for s in strategies if s.get('best')), None)
+    if not best_strategy:
+        return None
+    items = best_strategy['items']
+    name = ' + '.join(f"{item['units']}x {item['name']}" for item in items) if len(items) > 1 else items[0]['name']
+    units = items[0]['units'] if len(items) == 1 else None
+    return {'name': name, 'units': units, 'notes': best_strategy.get('notes', '')}
+
+def group_arcs(data):
+    strategies_by_slug = {a['slug']: a.get('strategies', NO_STRATEGIES) for a in data['arcs']}
+    grouped = {level: [] for level in THREAT_ORDER}
+    for arc in data['arc_list']:
+        strategies = strategies_by_slug.get(arc['slug'], NO_STRATEGIES)
+        grouped[arc['threat_level']].append({
+            **arc,
+            'has_data': bool(strategies),
+            'has_verified': any(s.get('verified') for s in strategies),
+            'best': best_summary(strategies),
+        })
+    return grouped
+
+GROUPED_ARCS = group_arcs(load_data())
+INDEX_PAGE = prerender('index.html', grouped_arcs=GROUPED_ARCS, threat_order=THREAT_ORDER)
 
 @app.route('/')
 def index():
-    data = load_data()
-    arc_data = {a['slug']: a for a in data['arcs']}
-    threat_order = ['extreme', 'critical', 'high', 'moderate', 'low']
-    grouped = {level: [] for level in threat_order}
-    for arc in data['arc_list']:
-        slug = arc['slug']
-        strategies = arc_data[slug].get('strategies', []) if slug in arc_data else []
-        arc['has_data'] = bool(strategies)
-        arc['has_verified'] = any(s.get('verified') for s in strategies)
-        arc['best'] = None
-        if slug in arc_data:
-            best_strategy = next((s for s in arc_data[slug].get('strategies', []) if s.get('best')), None)
-            if best_strategy:
-                items = best_strategy['items']
-                name = ' + '.join(f"{item['units']}x {item['name']}" for item in items) if len(items) > 1 else items[0]['name']
-                units = items[0]['units'] if len(items) == 1 else None
-                arc['best'] = {'name': name, 'units': units, 'notes': best_strategy.get('notes', '')}
-        grouped[arc['threat_level']].append(arc)
-    return render_template('index.html', grouped_arcs=grouped, threat_order=threat_order)
+    if app.debug:
+        return render_template('index.html', grouped_arcs=group_arcs(load_data()), threat_order=THREAT_ORDER)
+    return page_response(INDEX_PAGE)
+
+def arcs_by_slug(data):
+    arcs = {a['slug']: {**a, 'strategies': []} for a in data['arc_list']}
+    arcs.update((a['slug'], a) for a in data['arcs'])
+    return arcs
+
+ARCS_BY_SLUG = arcs_by_slug(load_data())
+
+DETAIL_PAGES = {slug: prerender('arc_detail.html', arc=arc) for slug, arc in ARCS_BY_SLUG.items()}
 
 @app.route('/arc/<slug>')
 def arc_detail(slug):
-    data = load_data()
-    arc = next((a for a in data['arcs'] if a['slug'] == slug), None)
-    if not arc:
-        arc_info = next((a for a in data['arc_list'] if a['slug'] == slug), None)
-        if arc_info:
-            arc = {**arc_info, 'strategies': []}
-        else:
+    if app.debug:
+        arc = arcs_by_slug(load_data()).get(slug)
+        if not arc:
             abort(404)
-    return render_template('arc_detail.html', arc=arc)
+        return render_template('arc_detail.html', arc=arc)
+    page = DETAIL_PAGES.get(slug)
+    if not page:
+        abort(404)
+    return page_response(page)
+
+gc.collect()
+gc.freeze()
 
 if __name__ == '__main__':
     app.run(debug=True, port=8080)
@@ -1,7 +1,8 @@
 import pytest
-from app import app, load_data
+from flask import render_template
+from app import app, load_data, best_summary, get_commit_sha, ARCS_BY_SLUG, COMMIT_SHA, GROUPED_ARCS, THREAT_ORDER
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def client():
     app.config['TESTING'] = True
     with app.test_client() as client:
@@ -12,14 +13,66 @@ def test_index_loads(client):
     assert rv.status_code == 200
     assert b'Arc Raiders' in rv.data
 
+def test_index_conditional_get(client):
+    rv = client.get('/')
+    assert rv.cache_control.public
+    assert rv.cache_control.max_age == 300
+    assert rv.cache_control.must_revalidate
+    rv = client.get('/', headers={'If-None-Match': rv.headers['ETag']})
+    assert rv.status_code == 304
+    assert rv.data == b''
+
+def test_commit_sha_in_footer(client):
+    rv = client.get('/')
+    assert f'/commit/{COMMIT_SHA}'.encode() in rv.data
+
+def test_get_commit_sha_reads_git_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv('SOURCE_VERSION', raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert get_commit_sha() == 'dev'
+    git = tmp_path / '.git'
+    (git / 'refs' / 'heads').mkdir(parents=True)
+    (git / 'HEAD').write_text('ref: refs/heads/main\n')
+    (git / 'packed-refs').write_text('# pack-refs with: peeled\n' + 'b' * 40 + ' refs/heads/main\n')
+    assert get_commit_sha() == 'bbbbbbb'
+    (git / 'refs' / 'heads' / 'main').write_text('a' * 40 + '\n')
+    assert get_commit_sha() == 'aaaaaaa'
+    monkeypatch.setenv('SOURCE_VERSION', 'c' * 40)
+    assert get_commit_sha() == 'ccccccc'
+
 def test_arc_detail_loads(client):
     rv = client.get('/arc/wasp')
     assert rv.status_code == 200
 
+def test_arc_detail_prerendered(client):
+    rv = client.get('/arc/matriarch')
+    assert client.get('/arc/matriarch', headers={'If-None-Match': rv.headers['ETag']}).status_code == 304
+    with app.test_request_context():
+        assert rv.get_data(as_text=True) == render_template('arc_detail.html', arc=ARCS_BY_SLUG['matriarch'])
+
+def test_every_listed_arc_has_detail_page():
+    assert set(ARCS_BY_SLUG) >= {a['slug'] for a in load_data()['arc_list']}
+
 def test_invalid_arc_404(client):
     rv = client.get('/arc/nonexistent')
     assert rv.status_code == 404
 
+def test_grouped_arcs_cover_arc_list():
+    assert list(GROUPED_ARCS) == THREAT_ORDER
+    assert sum(len(arcs) for arcs in GROUPED_ARCS.values()) == len(load_data()['arc_list'])
+
+def test_group_arcs_does_not_mutate_data():
+    for arc in load_data()['arc_list']:
+        assert 'best' not in arc, f"{arc['name']} was mutated by group_arcs"
+
+def test_best_summary():
+    single = {'best': True, 'notes': 'n', 'items': [{'type': 'weapon', 'name': 'Anvil', 'units': 3}]}
+    combo = {'best': True, 'items': [{'type': 'weapon', 'name': 'Anvil', 'units': 3}, {'type': 'explosive', 'name': 'Wolfpack', 'units': 1}]}
+    assert best_summary([]) is None
+    assert best_summary([{**single, 'best': False}]) is None
+    assert best_summary([single]) == {'name': 'Anvil', 'units': 3, 'notes': 'n'}
+    assert best_summary([combo]) == {'name': '3x Anvil + 1x Wolfpack', 'units': None, 'notes': ''}
+
 def test_data_json_valid():
     data = load_data()
     assert 'arc_list' in data
@@ -27,6 +80,9 @@ def test_data_json_valid():
     assert 'explosives' in data
     assert len(data['arc_list']) == 17
 
+def test_load_data_cached():
+    assert load_data() is load_data()
+
 def test_arcs_have_strategies():
     data = load_data()
     for arc in data['arcs']: